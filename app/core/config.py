@@ -7,6 +7,18 @@ class Settings(BaseSettings):
     MAX_VIDEO_SIZE_MB: int = 50
     UPLOAD_DIR: str = "/tmp/uploads"
 
+    # Landmark histories longer than this many frames are spilled to a
+    # memory-mapped file (<= 0 keeps everything in memory)
+    LANDMARK_SPILL_THRESHOLD_FRAMES: int = 9000
+    LANDMARK_SPILL_DIR: str = "/tmp/landmarks"
+
+    # On-demand request profiling (admin endpoints are disabled while the token is empty)
+    PROFILING_ADMIN_TOKEN: str = ""
+    PROFILING_HEADER: str = "X-Profile-Request"
+    PROFILING_DIR: str = "/tmp/profiles"
+    PROFILING_MAX_FILES: int = 20
+    PROFILING_MAX_TOTAL_MB: int = 100
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,13 @@
+import secrets
+from fastapi import Header, HTTPException
+from app.core.config import settings
+
+def require_admin(x_admin_token: str = Header(None)):
+    # Profiling endpoints do not exist unless an admin token is configured
+    if not settings.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Compare bytes: compare_digest rejects non-ASCII str
+    if not x_admin_token or not secrets.compare_digest(
+        x_admin_token.encode(), settings.PROFILING_ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
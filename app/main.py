@@ -1,9 +1,14 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request, Depends
+from fastapi.responses import FileResponse
 from app.core.config import settings
+from app.core.security import require_admin
 from app.schemas.analysis import AnalysisResponse, AnalysisMetadata
+from app.schemas.profiling import ProfilingConfig, ProfilingStatus, ProfileInfo
 from app.services.video_processor import VideoProcessor
 from app.services.metrics_engine import MetricsEngine
+from app.services.profiler import request_profiler
 from app.utils.file_handling import save_upload_file_tmp, delete_file
+import numpy as np
 import shutil
 import os
 
@@ -11,6 +16,7 @@ app = FastAPI(title=settings.PROJECT_NAME)
 
 @app.post("/analyze-video", response_model=AnalysisResponse)
 async def analyze_video(
+    request: Request,
     background_tasks: BackgroundTasks,
     video: UploadFile = File(...),
     idade: int = Form(...),
@@ -22,6 +28,10 @@ async def analyze_video(
 
     # Save temp file
     temp_path = save_upload_file_tmp(video)
+
+    # None unless profiling was armed through the admin endpoints
+    profile_session = request_profiler.begin(request.headers)
+    video_data = None
     
     try:
         # Process Video
@@ -39,7 +49,7 @@ async def analyze_video(
 
         # 1. Check for human detection coverage
         # If less than 30% of frames have landmarks, consider it "no human"
-        frames_with_landmarks = sum(1 for f in video_data['history'] if f['landmarks'] is not None)
+        frames_with_landmarks = video_data['history'].detected_count()
         human_detection_ratio = frames_with_landmarks / video_data['total_frames']
         
         if human_detection_ratio < 0.3:
@@ -56,10 +66,17 @@ async def analyze_video(
             )
 
         # Calculate Metrics
-        engine = MetricsEngine(fps=video_data['fps'])
+        engine = MetricsEngine(
+            fps=video_data['fps'],
+            frame_width=video_data['width'],
+            frame_height=video_data['height']
+        )
         
+        # Series for the exercise plan, extracted once and shared by both steps
+        series = engine.extract_plan_series(video_data['history'], exercicio)
+
         # 2. Check for exercise evidence
-        if not engine.validate_evidence(video_data['history']):
+        if not engine.validate_evidence(video_data['history'], exercicio, series):
             return AnalysisResponse(
                 metadata=AnalysisMetadata(
                     idade=idade, 
@@ -72,7 +89,7 @@ async def analyze_video(
                 status="invalido"
             )
 
-        metricas, eventos, key_frames = engine.calculate_metrics(video_data['history'])
+        metricas, eventos, key_frames = engine.calculate_metrics(video_data['history'], exercicio, series)
         
         # 3. Extract Screenshots (max 5)
         # Sort key frames and take a diverse sample if many
@@ -124,6 +141,47 @@ async def analyze_video(
         # Cleanup
         background_tasks.add_task(delete_file, temp_path)
 
+        # Diagnostics must never turn a finished analysis into a 500
+        if video_data is not None:
+            try:
+                video_data['history'].close()
+            except Exception as e:
+                print(f"Error releasing landmark history: {e}")
+
+        if profile_session is not None:
+            try:
+                request_profiler.finish(profile_session, {"exercicio": exercicio, "idade": idade})
+            except Exception as e:
+                print(f"Error saving request profile: {e}")
+
 @app.get("/")
 def read_root():
     return {"message": "MediaPipe Movement Analysis API is running"}
+
+@app.get("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+def get_profiling_status():
+    return request_profiler.status()
+
+@app.post("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+def enable_profiling(config: ProfilingConfig):
+    if config.requests < 0:
+        raise HTTPException(status_code=400, detail="requests must be >= 0")
+    request_profiler.arm(config.requests, config.match_value)
+    return request_profiler.status()
+
+@app.delete("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+def disable_profiling():
+    request_profiler.disarm()
+    return request_profiler.status()
+
+@app.get("/admin/profiles", response_model=list[ProfileInfo], dependencies=[Depends(require_admin)])
+def list_profiles():
+    return request_profiler.list_profiles()
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: str):
+    """Raw pstats dump; loadable with pstats, snakeviz or flameprof."""
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
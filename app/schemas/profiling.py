@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+
+class ProfilingConfig(BaseModel):
+    requests: int = 0
+    match_value: Optional[str] = None
+
+class ProfilingStatus(BaseModel):
+    enabled: bool
+    remaining_requests: int
+    match_header: Optional[str] = None
+
+class StageTiming(BaseModel):
+    calls: int
+    cumtime_s: float
+
+class ProfileInfo(BaseModel):
+    id: str
+    reason: str
+    created_at: float
+    duration_s: float
+    size_bytes: int
+    stages: Dict[str, StageTiming]
+    metadata: Dict[str, Any]
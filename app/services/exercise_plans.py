@@ -0,0 +1,195 @@
+import numpy as np
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+# MediaPipe Pose landmark indices
+LANDMARKS = {
+    "l_shoulder": 11,
+    "r_shoulder": 12,
+    "l_hip": 23,
+    "r_hip": 24,
+    "l_knee": 25,
+    "r_knee": 26,
+    "l_ankle": 27,
+    "r_ankle": 28,
+    "l_foot_index": 31,
+    "r_foot_index": 32,
+}
+
+
+# Per-video scalar (frame width / height) supplied by MetricsEngine rather than
+# extracted from the landmarks
+ASPECT_RATIO = "aspect_ratio"
+
+
+class SeriesSpec(NamedTuple):
+    # Raw landmark coordinate when `landmark` is set, otherwise derived from `inputs`
+    landmark: Optional[str] = None
+    axis: Optional[str] = None
+    inputs: Tuple[str, ...] = ()
+    fn: Optional[Callable[..., np.ndarray]] = None
+
+
+def _raw(landmark: str, axis: str) -> SeriesSpec:
+    return SeriesSpec(landmark=landmark, axis=axis)
+
+
+def _midpoint(a: str, b: str) -> SeriesSpec:
+    return SeriesSpec(inputs=(a, b), fn=lambda a, b: (a + b) / 2.0)
+
+
+def _abs_diff(a: str, b: str) -> SeriesSpec:
+    return SeriesSpec(inputs=(a, b), fn=lambda a, b: np.abs(a - b))
+
+
+def _velocity(a: str) -> SeriesSpec:
+    # Per-frame displacement
+    return SeriesSpec(inputs=(a,), fn=np.diff)
+
+
+def _joint_angle(a: str, b: str, c: str) -> SeriesSpec:
+    """2D angle ABC in degrees for every frame; NaN where a segment is degenerate."""
+    def angle(aspect_ratio, ax, ay, bx, by, cx, cy):
+        # Normalized x is relative to the frame width and y to its height;
+        # scale x by width/height so both axes share the same unit
+        ba_x, ba_y = (ax - bx) * aspect_ratio, ay - by
+        bc_x, bc_y = (cx - bx) * aspect_ratio, cy - by
+        norm = np.hypot(ba_x, ba_y) * np.hypot(bc_x, bc_y)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cosine = (ba_x * bc_x + ba_y * bc_y) / norm
+        degrees = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+        # Overlapping landmarks carry no angle; treat them like missing ones
+        return np.where(norm == 0, np.nan, degrees)
+
+    return SeriesSpec(
+        inputs=(ASPECT_RATIO, f"{a}_x", f"{a}_y", f"{b}_x", f"{b}_y", f"{c}_x", f"{c}_y"),
+        fn=angle,
+    )
+
+
+SERIES: Dict[str, SeriesSpec] = {
+    **{f"{name}_{axis}": _raw(name, axis) for name in LANDMARKS for axis in ("x", "y")},
+    "trunk_x": _midpoint("l_shoulder_x", "r_shoulder_x"),
+    "hip_center_x": _midpoint("l_hip_x", "r_hip_x"),
+    "knee_y_diff": _abs_diff("l_knee_y", "r_knee_y"),
+    "ankle_x_gap": _abs_diff("l_ankle_x", "r_ankle_x"),
+    "ankle_y_gap": _abs_diff("l_ankle_y", "r_ankle_y"),
+    "l_hip_velocity_y": _velocity("l_hip_y"),
+    "l_knee_angle": _joint_angle("l_hip", "l_knee", "l_ankle"),
+    "r_knee_angle": _joint_angle("r_hip", "r_knee", "r_ankle"),
+    "l_hip_angle": _joint_angle("l_shoulder", "l_hip", "l_knee"),
+    "r_hip_angle": _joint_angle("r_shoulder", "r_hip", "r_knee"),
+}
+
+# Series each metric / event / evidence check reads. The calculations live in MetricsEngine.
+METRICS: Dict[str, Tuple[str, ...]] = {
+    "estabilidade_tronco": ("trunk_x",),
+    "simetria_membros_inferiores": ("knee_y_diff",),
+    "consistencia_ritmo": ("l_hip_velocity_y",),
+    "amplitude_movimento": ("l_hip_y",),
+    "amplitude_flexao_joelho": ("l_knee_angle", "r_knee_angle"),
+    "amplitude_extensao_quadril": ("l_hip_angle", "r_hip_angle"),
+}
+
+EVENTS: Dict[str, Tuple[str, ...]] = {
+    "perda_equilibrio": ("l_ankle_x", "r_ankle_x", "hip_center_x"),
+}
+
+EVIDENCE: Dict[str, Tuple[str, ...]] = {
+    "deslocamento_vertical_quadril": ("l_hip_y",),
+    "alternancia_passos": ("ankle_x_gap", "ankle_y_gap"),
+}
+
+
+class ExercisePlan(NamedTuple):
+    metrics: Tuple[str, ...]
+    events: Tuple[str, ...] = ("perda_equilibrio",)
+    # Check that the video actually shows the exercise
+    evidence: str = "deslocamento_vertical_quadril"
+
+
+DEFAULT_PLAN = "padrao"
+
+PLANS: Dict[str, ExercisePlan] = {
+    DEFAULT_PLAN: ExercisePlan(metrics=(
+        "estabilidade_tronco", "simetria_membros_inferiores", "consistencia_ritmo", "amplitude_movimento",
+    )),
+    "agachamento": ExercisePlan(metrics=(
+        "estabilidade_tronco", "simetria_membros_inferiores", "consistencia_ritmo", "amplitude_movimento",
+        "amplitude_flexao_joelho",
+    )),
+    "afundo": ExercisePlan(metrics=(
+        "estabilidade_tronco", "consistencia_ritmo", "amplitude_movimento", "amplitude_flexao_joelho",
+    )),
+    "sentar_levantar": ExercisePlan(metrics=(
+        "estabilidade_tronco", "simetria_membros_inferiores", "consistencia_ritmo", "amplitude_movimento",
+        "amplitude_extensao_quadril",
+    )),
+    "marcha": ExercisePlan(metrics=(
+        "estabilidade_tronco", "simetria_membros_inferiores", "consistencia_ritmo",
+    ), evidence="alternancia_passos"),
+}
+
+ALIASES = {
+    "squat": "agachamento",
+    "lunge": "afundo",
+    "sit_to_stand": "sentar_levantar",
+    "gait": "marcha",
+    "caminhada": "marcha",
+}
+
+
+class CompiledPlan(NamedTuple):
+    name: str
+    metrics: Tuple[str, ...]
+    events: Tuple[str, ...]
+    evidence: str
+    # Raw series and their (landmark index, axis) columns, extracted in one pass
+    raw_series: Tuple[str, ...]
+    columns: Tuple[Tuple[int, str], ...]
+    # Derived series in dependency order
+    derived_series: Tuple[str, ...]
+
+
+def resolve_exercise(exercicio: Optional[str]) -> str:
+    """Maps a free-form exercise name to a registered plan, falling back to the default."""
+    if not exercicio:
+        return DEFAULT_PLAN
+    key = exercicio.strip().lower().replace("-", "_").replace(" ", "_")
+    key = ALIASES.get(key, key)
+    return key if key in PLANS else DEFAULT_PLAN
+
+
+@lru_cache(maxsize=None)
+def compile_plan(name: str) -> CompiledPlan:
+    """Resolves every series a plan needs, once per exercise."""
+    plan = PLANS[name]
+    required = (
+        [s for m in plan.metrics for s in METRICS[m]]
+        + [s for e in plan.events for s in EVENTS[e]]
+        + list(EVIDENCE[plan.evidence])
+    )
+
+    raw, derived, seen = [], [], set()
+
+    def visit(series_name: str):
+        if series_name in seen or series_name == ASPECT_RATIO:
+            return
+        seen.add(series_name)
+        spec = SERIES[series_name]
+        for dep in spec.inputs:
+            visit(dep)
+        (raw if spec.landmark else derived).append(series_name)
+
+    for series_name in required:
+        visit(series_name)
+
+    return CompiledPlan(
+        name=name,
+        metrics=plan.metrics,
+        events=plan.events,
+        evidence=plan.evidence,
+        raw_series=tuple(raw),
+        columns=tuple((LANDMARKS[SERIES[s].landmark], SERIES[s].axis) for s in raw),
+        derived_series=tuple(derived),
+    )
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+from typing import List, Dict, Optional, Iterator, Tuple
+
+from app.core.config import settings
+
+NUM_LANDMARKS = 33
+AXES = ('x', 'y', 'z', 'visibility')
+
+# One record per frame: number of landmarks (-1 when no pose was detected)
+# followed by the coordinates, NaN where a value is missing. MediaPipe reports
+# float32 landmarks, so float32 storage is lossless.
+FRAME_DTYPE = np.dtype([
+    ('count', np.int16),
+    ('coords', np.float32, (NUM_LANDMARKS, len(AXES))),
+])
+
+
+def extract_columns(history, columns: List[Tuple[int, str]]) -> np.ndarray:
+    """
+    Extracts several (landmark index, axis) time series in a single pass.
+    Returns an array of shape (frames, len(columns)), NaN where missing.
+    """
+    if isinstance(history, LandmarkHistory):
+        return history.columns(columns)
+
+    out = np.full((len(history), len(columns)), np.nan)
+    for i, frame in enumerate(history):
+        lms = frame['landmarks']
+        if not lms:
+            continue
+        for j, (idx, axis) in enumerate(columns):
+            if len(lms) > idx:
+                out[i, j] = lms[idx].get(axis, np.nan)
+    return out
+
+
+class LandmarkHistory:
+    """
+    Frame-by-frame landmark history with bounded memory.
+    Frames are kept as plain dicts until `spill_threshold` frames have been
+    recorded; from then on every frame is appended to an anonymous temporary
+    file and series are read back by mapping one chunk of it at a time.
+    """
+
+    def __init__(self, fps: float, spill_threshold: Optional[int] = None,
+                 spill_dir: Optional[str] = None, chunk_size: int = 4096):
+        self.fps = fps
+        self.spill_threshold = settings.LANDMARK_SPILL_THRESHOLD_FRAMES if spill_threshold is None else spill_threshold
+        self.spill_dir = spill_dir or settings.LANDMARK_SPILL_DIR
+        self.chunk_size = chunk_size
+
+        self._frames: List[Dict] = []
+        self._length = 0
+        self._spill = None
+        self._finalizer = None
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._spill is not None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _timestamp(self, idx: int) -> float:
+        return idx / self.fps if self.fps > 0 else 0
+
+    def append(self, landmarks: Optional[List[Dict]]):
+        if self._spill is None:
+            self._frames.append({
+                "frame": self._length,
+                "timestamp": self._timestamp(self._length),
+                "landmarks": landmarks
+            })
+            self._length += 1
+            # Threshold <= 0 keeps everything in memory
+            if 0 < self.spill_threshold <= self._length:
+                self._start_spill()
+            return
+
+        self._write_record(landmarks)
+        self._length += 1
+
+    def _write_record(self, landmarks: Optional[List[Dict]]):
+        record = np.zeros(1, dtype=FRAME_DTYPE)
+        record['coords'] = np.nan
+        if landmarks is None:
+            record['count'] = -1
+        else:
+            record['count'] = min(len(landmarks), NUM_LANDMARKS)
+            for j, lm in enumerate(landmarks[:NUM_LANDMARKS]):
+                record['coords'][0, j] = [lm.get(axis, np.nan) for axis in AXES]
+        self._spill.write(record.tobytes())
+
+    def _start_spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".landmarks", dir=self.spill_dir)
+        # Unlinked right away: the data lives only as long as the open file,
+        # so a crashed or OOM-killed worker cannot leave it behind
+        os.unlink(path)
+        self._spill = os.fdopen(fd, 'w+b')
+        self._finalizer = weakref.finalize(self, self._spill.close)
+
+        for frame in self._frames:
+            self._write_record(frame['landmarks'])
+        self._frames = []
+
+    def _chunks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Maps [start, stop) one chunk at a time; each mapping is dropped before the next."""
+        stop = self._length if stop is None else stop
+        self._spill.flush()
+        for chunk_start in range(start, stop, self.chunk_size):
+            count = min(self.chunk_size, stop - chunk_start)
+            chunk = np.memmap(self._spill, dtype=FRAME_DTYPE, mode='r',
+                              offset=chunk_start * FRAME_DTYPE.itemsize, shape=(count,))
+            yield chunk_start, chunk
+            del chunk
+
+    def series(self, idx: int, axis: str = 'y') -> np.ndarray:
+        """Time series of one coordinate of one landmark."""
+        return self.columns([(idx, axis)])[:, 0]
+
+    def columns(self, columns: List[Tuple[int, str]]) -> np.ndarray:
+        """Several (landmark index, axis) series, read in one pass over the frames."""
+        if self._spill is None:
+            return extract_columns(self._frames, columns)
+
+        out = np.full((self._length, len(columns)), np.nan)
+        stored = [j for j, (idx, axis) in enumerate(columns) if idx < NUM_LANDMARKS and axis in AXES]
+        if not stored:
+            return out
+
+        lm_idx = [columns[j][0] for j in stored]
+        axis_idx = [AXES.index(columns[j][1]) for j in stored]
+        for start, chunk in self._chunks():
+            out[start:start + len(chunk), stored] = chunk['coords'][:, lm_idx, axis_idx]
+        return out
+
+    def detected_count(self) -> int:
+        """Number of frames where a pose was detected."""
+        if self._spill is None:
+            return sum(1 for f in self._frames if f['landmarks'] is not None)
+
+        return sum(int(np.count_nonzero(chunk['count'] >= 0)) for _, chunk in self._chunks())
+
+    def __getitem__(self, idx: int) -> Dict:
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError("frame index out of range")
+        if self._spill is None:
+            return self._frames[idx]
+
+        for _, chunk in self._chunks(idx, idx + 1):
+            count = int(chunk['count'][0])
+            coords = np.array(chunk['coords'][0])
+        landmarks = None
+        if count >= 0:
+            landmarks = [
+                {axis: float(coords[j, k]) for k, axis in enumerate(AXES)}
+                for j in range(count)
+            ]
+        return {"frame": idx, "timestamp": self._timestamp(idx), "landmarks": landmarks}
+
+    def __iter__(self) -> Iterator[Dict]:
+        for idx in range(self._length):
+            yield self[idx]
+
+    def close(self):
+        """Releases the spill file, if any."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._spill = None
@@ -1,48 +1,31 @@
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from app.schemas.analysis import MetricDetail
+from app.services.landmark_store import extract_columns
+from app.services.exercise_plans import SERIES, ASPECT_RATIO, CompiledPlan, compile_plan, resolve_exercise
 
 class MetricsEngine:
-    def __init__(self, fps: float):
+    def __init__(self, fps: float, frame_width: Optional[int] = None, frame_height: Optional[int] = None):
         self.fps = fps
-        # Landmark indices
-        self.L_SHOULDER = 11
-        self.R_SHOULDER = 12
-        self.L_HIP = 23
-        self.R_HIP = 24
-        self.L_KNEE = 25
-        self.R_KNEE = 26
-        self.L_ANKLE = 27
-        self.R_ANKLE = 28
-        self.L_FOOT_INDEX = 31
-        self.R_FOOT_INDEX = 32
-
-    def _extract_series(self, history: List[Dict], idx: int, axis: str = 'y') -> np.ndarray:
-        """Extracts a time series of a specific coordinate for a landmark."""
-        series = []
-        for frame in history:
-            lms = frame['landmarks']
-            if lms and len(lms) > idx:
-                val = lms[idx].get(axis, np.nan)
-                series.append(val)
-            else:
-                series.append(np.nan)
-        return np.array(series)
-
-    def _calculate_angle(self, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
-        """Calculates angle ABC in degrees."""
-        ba = a - b
-        bc = c - b
-        
-        norm_ba = np.linalg.norm(ba)
-        norm_bc = np.linalg.norm(bc)
-        
-        if norm_ba == 0 or norm_bc == 0:
-            return 0.0
-            
-        cosine_angle = np.dot(ba, bc) / (norm_ba * norm_bc)
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return np.degrees(angle)
+        # Landmarks are normalized per axis; angles need the frame proportions
+        self.aspect_ratio = frame_width / frame_height if frame_width and frame_height else 1.0
+
+        # Metric / event name (see exercise_plans) -> calculation over the plan's series
+        self._metric_fns = {
+            "estabilidade_tronco": self._trunk_stability,
+            "simetria_membros_inferiores": self._lower_limb_symmetry,
+            "consistencia_ritmo": self._rhythm_consistency,
+            "amplitude_movimento": self._range_of_motion,
+            "amplitude_flexao_joelho": self._knee_flexion,
+            "amplitude_extensao_quadril": self._hip_extension,
+        }
+        self._event_fns = {
+            "perda_equilibrio": self._balance_loss,
+        }
+        self._evidence_fns = {
+            "deslocamento_vertical_quadril": self._hip_vertical_travel,
+            "alternancia_passos": self._step_alternation,
+        }
 
     def _normalize_score(self, val: float, min_good: float, max_good: float) -> float:
         """Simple normalization logic. 1.0 if within optimal range, drops otherwise."""
@@ -60,34 +43,79 @@ class MetricsEngine:
         if score >= 0.5: return "regular"
         return "baixa"
 
-    def validate_evidence(self, history: List[Dict]) -> bool:
+    def extract_plan_series(self, history, exercicio: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Every series the exercise plan needs, read from the history in one pass.
+        Pass the result to validate_evidence and calculate_metrics so the
+        history is only scanned once.
+        """
+        return self._evaluate_series(history, compile_plan(resolve_exercise(exercicio)))
+
+    def validate_evidence(self, history, exercicio: Optional[str] = None,
+                          series: Optional[Dict[str, np.ndarray]] = None) -> bool:
         """
-        Heuristic to check if there is enough evidence of the exercise.
-        Check if there's a minimum movement (Range of Motion).
+        Heuristic to check if there is enough evidence of the exercise,
+        using the check declared by the exercise plan.
         """
-        l_hip_y = self._extract_series(history, self.L_HIP, 'y')
+        plan = compile_plan(resolve_exercise(exercicio))
+        if series is None:
+            series = self._evaluate_series(history, plan)
+        return self._evidence_fns[plan.evidence](series)
+
+    def _has_travel(self, values: np.ndarray, threshold: float = 0.05) -> bool:
         # Remove NaNs for calculation
-        valid_hips = l_hip_y[~np.isnan(l_hip_y)]
-        
-        if len(valid_hips) < 2:
+        valid = values[~np.isnan(values)]
+        if len(valid) < 2:
             return False
-            
-        rom_val = np.nanmax(valid_hips) - np.nanmin(valid_hips)
-        # 0.05 is a heuristic for "some significant vertical movement"
+        # 0.05 is a heuristic for "some significant movement"
         # in normalized coordinates (0 to 1)
-        return rom_val > 0.05
+        return bool(np.max(valid) - np.min(valid) > threshold)
+
+    def _hip_vertical_travel(self, series: Dict[str, np.ndarray]) -> bool:
+        # Check if there's a minimum vertical hip movement (Range of Motion)
+        return self._has_travel(series["l_hip_y"])
+
+    def _step_alternation(self, series: Dict[str, np.ndarray]) -> bool:
+        # Feet separating and closing, seen from the side (x) or the front (y)
+        return self._has_travel(series["ankle_x_gap"]) or self._has_travel(series["ankle_y_gap"])
 
-    def calculate_metrics(self, history: List[Dict]) -> Tuple[Dict[str, Any], Dict[str, Any], List[int]]:
+    def _evaluate_series(self, history, plan: CompiledPlan) -> Dict[str, np.ndarray]:
+        """Extracts the plan's raw series in one pass, then derives the rest in dependency order."""
+        raw = extract_columns(history, list(plan.columns))
+        series = {name: raw[:, j] for j, name in enumerate(plan.raw_series)}
+        series[ASPECT_RATIO] = self.aspect_ratio
+        for name in plan.derived_series:
+            spec = SERIES[name]
+            series[name] = spec.fn(*(series[dep] for dep in spec.inputs))
+        return series
+
+    def calculate_metrics(self, history, exercicio: Optional[str] = None,
+                          series: Optional[Dict[str, np.ndarray]] = None) -> Tuple[Dict[str, Any], Dict[str, Any], List[int]]:
         if not history:
             return {}, {}, []
-        
+
+        plan = compile_plan(resolve_exercise(exercicio))
+        if series is None:
+            series = self._evaluate_series(history, plan)
+
         key_frames = []
-        
-        # 1. Stability (Estabilidade Tronco)
-        # Measure lateral sway of the midpoint between shoulders and hips
-        l_sh_x = self._extract_series(history, self.L_SHOULDER, 'x')
-        r_sh_x = self._extract_series(history, self.R_SHOULDER, 'x')
-        trunk_x = (l_sh_x + r_sh_x) / 2.0
+        metricas = {}
+        for name in plan.metrics:
+            metricas[name], frames = self._metric_fns[name](series)
+            key_frames.extend(frames)
+
+        eventos = {name: self._event_fns[name](series) for name in plan.events}
+
+        valid_key_frames = []
+        for f_idx in key_frames:
+            if f_idx < len(history) and history[f_idx]['landmarks'] is not None:
+                valid_key_frames.append(f_idx)
+
+        return metricas, eventos, list(set(valid_key_frames))
+
+    def _trunk_stability(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
+        # Measure lateral sway of the midpoint between shoulders
+        trunk_x = series["trunk_x"]
         # Calculate standard deviation of lateral movement (sway)
         sway = np.nanstd(trunk_x)
         stability_score = max(0.0, 1.0 - (sway * 5.0)) # Heuristic: sway > 0.2 is bad
@@ -96,21 +124,17 @@ class MetricsEngine:
             "classificacao": self._classify(stability_score),
             "descricao": "Baixa oscilação lateral do tronco detectada." if stability_score > 0.8 else "Oscilação lateral considerável."
         }
-        
+
+        key_frames = []
         # Frame with max sway from mean
         if not np.all(np.isnan(trunk_x)):
             mean_x = np.nanmean(trunk_x)
-            max_sway_idx = int(np.nanargmax(np.abs(trunk_x - mean_x)))
-            key_frames.append(max_sway_idx)
-
-        # 2. Symmetry (Membros Inferiores)
-        # Compare left vs right knee Y-movement or Angles
-        # Let's check foot vertical position correlation
-        l_knee_y = self._extract_series(history, self.L_KNEE, 'y')
-        r_knee_y = self._extract_series(history, self.R_KNEE, 'y')
-        
-        # Mean absolute difference
-        diffs = np.abs(l_knee_y - r_knee_y)
+            key_frames.append(int(np.nanargmax(np.abs(trunk_x - mean_x))))
+        return stability, key_frames
+
+    def _lower_limb_symmetry(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
+        # Mean absolute difference between left and right knee height
+        diffs = series["knee_y_diff"]
         diff = np.nanmean(diffs)
         symmetry_score = max(0.0, 1.0 - (diff * 5.0))
         symmetry = {
@@ -118,16 +142,15 @@ class MetricsEngine:
             "classificacao": self._classify(symmetry_score),
             "descricao": "Movimento simétrico entre perna esquerda e direita." if symmetry_score > 0.8 else "Assimetria detectada nos membros inferiores."
         }
-        
+
+        key_frames = []
         if not np.all(np.isnan(diffs)):
-            max_asymmetry_idx = int(np.nanargmax(diffs))
-            key_frames.append(max_asymmetry_idx)
-
-        # 3. Rhythm (Consistencia)
-        # Standard deviation of vertical velocity of hips
-        l_hip_y = self._extract_series(history, self.L_HIP, 'y')
-        velocity = np.diff(l_hip_y)
-        accels = np.abs(np.diff(velocity))
+            key_frames.append(int(np.nanargmax(diffs)))
+        return symmetry, key_frames
+
+    def _rhythm_consistency(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
+        # Standard deviation of vertical acceleration of hips
+        accels = np.abs(np.diff(series["l_hip_velocity_y"]))
         accel_variance = np.nanstd(accels) # smoothness
         rhythm_score = max(0.0, 1.0 - (accel_variance * 50.0)) # High jitter = bad rhythm
         rhythm = {
@@ -135,23 +158,26 @@ class MetricsEngine:
             "classificacao": self._classify(rhythm_score),
             "descricao": "Ritmo fluido e constante." if rhythm_score > 0.8 else "Variações bruscas de velocidade."
         }
-        
+
+        key_frames = []
         if not np.all(np.isnan(accels)):
-            max_jitter_idx = int(np.nanargmax(accels)) + 1 # +1 due to diff
-            key_frames.append(max_jitter_idx)
-        
-        # 4. Range of Motion (Amplitude)
+            key_frames.append(int(np.nanargmax(accels)) + 1) # +1 due to diff
+        return rhythm, key_frames
+
+    def _range_of_motion(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
         # Max - Min vertical hip movement
+        l_hip_y = series["l_hip_y"]
+        key_frames = []
         valid_indices = np.where(~np.isnan(l_hip_y))[0]
         if len(valid_indices) > 0:
             min_y_idx = int(valid_indices[np.argmin(l_hip_y[valid_indices])])
             max_y_idx = int(valid_indices[np.argmax(l_hip_y[valid_indices])])
-            
+
             rom_val = l_hip_y[max_y_idx] - l_hip_y[min_y_idx]
             key_frames.extend([min_y_idx, max_y_idx])
         else:
             rom_val = 0
-            
+
         # Assuming normalized coordinates (0-1), a full squat might be 0.3-0.5 change
         rom_score = min(1.0, rom_val * 2.0)
         rom = {
@@ -159,13 +185,56 @@ class MetricsEngine:
             "classificacao": self._classify(rom_score),
             "descricao": "Boa amplitude de movimento." if rom_score > 0.7 else "Amplitude reduzida."
         }
+        return rom, key_frames
+
+    def _knee_flexion(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
+        # Deepest knee bend, taking the more flexed side (front leg in a lunge)
+        knee_angle = np.fmin(series["l_knee_angle"], series["r_knee_angle"])
+        key_frames = []
+        if not np.all(np.isnan(knee_angle)):
+            deepest_idx = int(np.nanargmin(knee_angle))
+            flexion = 180.0 - knee_angle[deepest_idx]
+            key_frames.append(deepest_idx)
+        else:
+            flexion = 0.0
+
+        # ~90 degrees of flexion (thighs parallel to the floor) counts as full depth
+        flexion_score = float(min(1.0, flexion / 90.0))
+        knee = {
+            "valor": round(flexion_score, 2),
+            "classificacao": self._classify(flexion_score),
+            "descricao": "Boa flexão de joelhos." if flexion_score > 0.7 else "Flexão de joelhos reduzida."
+        }
+        return knee, key_frames
+
+    def _hip_extension(self, series: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], List[int]]:
+        # Range of the trunk-thigh angle between seated and standing
+        hip_angle = np.fmin(series["l_hip_angle"], series["r_hip_angle"])
+        key_frames = []
+        valid_indices = np.where(~np.isnan(hip_angle))[0]
+        if len(valid_indices) > 0:
+            min_idx = int(valid_indices[np.argmin(hip_angle[valid_indices])])
+            max_idx = int(valid_indices[np.argmax(hip_angle[valid_indices])])
+            extension = hip_angle[max_idx] - hip_angle[min_idx]
+            key_frames.extend([min_idx, max_idx])
+        else:
+            extension = 0.0
+
+        # Seated (~90 degrees) to upright (~180 degrees)
+        extension_score = float(min(1.0, extension / 90.0))
+        hip = {
+            "valor": round(extension_score, 2),
+            "classificacao": self._classify(extension_score),
+            "descricao": "Extensão completa do quadril ao levantar." if extension_score > 0.7 else "Extensão do quadril incompleta."
+        }
+        return hip, key_frames
 
-        # 5. Events (Perda de Equilibrio)
+    def _balance_loss(self, series: Dict[str, np.ndarray]) -> int:
         # Check if center of mass (hips) X goes outside ankles X
-        l_ankle_x = self._extract_series(history, self.L_ANKLE, 'x')
-        r_ankle_x = self._extract_series(history, self.R_ANKLE, 'x')
-        hip_center_x = (self._extract_series(history, self.L_HIP, 'x') + self._extract_series(history, self.R_HIP, 'x')) / 2.0
-        
+        l_ankle_x = series["l_ankle_x"]
+        r_ankle_x = series["r_ankle_x"]
+        hip_center_x = series["hip_center_x"]
+
         balance_loss_count = 0
         frames = len(l_ankle_x)
         for i in range(frames):
@@ -177,22 +246,4 @@ class MetricsEngine:
             margin = (max_x - min_x) * 0.1
             if hip_center_x[i] < (min_x - margin) or hip_center_x[i] > (max_x + margin):
                 balance_loss_count += 1
-        
-        # Reduce noise (single frames)
-        metricas = {
-            "estabilidade_tronco": stability,
-            "simetria_membros_inferiores": symmetry,
-            "consistencia_ritmo": rhythm,
-            "amplitude_movimento": rom,
-        }
-        
-        eventos = {
-            "perda_equilibrio": balance_loss_count
-        }
-
-        valid_key_frames = []
-        for f_idx in key_frames:
-            if f_idx < len(history) and history[f_idx]['landmarks'] is not None:
-                valid_key_frames.append(f_idx)
-
-        return metricas, eventos, list(set(valid_key_frames))
+        return balance_loss_count
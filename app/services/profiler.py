@@ -0,0 +1,200 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+# Stages reported in the per-profile breakdown: name -> (file suffix, function name).
+# Timings are read from the cProfile stats afterwards, so the hot path carries no
+# extra instrumentation.
+STAGES = {
+    "process_video": (os.path.join("services", "video_processor.py"), "process_video"),
+    "pose.process": (os.path.join("solutions", "pose.py"), "process"),
+    "calculate_metrics": (os.path.join("services", "metrics_engine.py"), "calculate_metrics"),
+    "extract_screenshots": (os.path.join("services", "video_processor.py"), "extract_screenshots"),
+}
+
+
+class ProfileSession:
+    def __init__(self, reason: str):
+        self.id = uuid.uuid4().hex
+        self.reason = reason
+        self.started_at = time.time()
+        self.profile = cProfile.Profile()
+
+
+class RequestProfiler:
+    """
+    On-demand cProfile capture for /analyze-video requests.
+    Disarmed by default; `begin` is a single attribute check in that state.
+    """
+
+    def __init__(self, profile_dir: str, max_files: int, max_total_bytes: int, header: str):
+        self.profile_dir = profile_dir
+        self.max_files = max_files
+        self.max_total_bytes = max_total_bytes
+        self.header = header
+        self._lock = threading.Lock()
+        self._armed = False
+        self._remaining = 0
+        self._match_value: Optional[str] = None
+
+    def arm(self, requests: int = 0, match_value: Optional[str] = None):
+        """Profiles the next `requests` requests and/or every request whose
+        profiling header equals `match_value`."""
+        with self._lock:
+            self._remaining = max(0, requests)
+            self._match_value = match_value or None
+            self._armed = self._remaining > 0 or self._match_value is not None
+
+    def disarm(self):
+        self.arm(0, None)
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self._armed,
+            "remaining_requests": self._remaining,
+            "match_header": self.header if self._match_value is not None else None,
+        }
+
+    def begin(self, headers) -> Optional[ProfileSession]:
+        """Starts profiling the current request if it should be sampled."""
+        if not self._armed:
+            return None
+
+        with self._lock:
+            if self._match_value is not None and headers.get(self.header) == self._match_value:
+                reason = "header"
+            elif self._remaining > 0:
+                reason = "count"
+            else:
+                return None
+
+            session = ProfileSession(reason)
+            try:
+                session.profile.enable()
+            except ValueError:
+                # Another profiler is already attached to this thread; keep the
+                # armed request for the next one
+                return None
+
+            if reason == "count":
+                self._remaining -= 1
+            self._armed = self._remaining > 0 or self._match_value is not None
+        return session
+
+    def finish(self, session: ProfileSession, metadata: Optional[Dict] = None) -> Dict:
+        """Stops the session, stores the pstats dump with its stage breakdown
+        and applies the retention limits."""
+        session.profile.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        info = {
+            "id": session.id,
+            "reason": session.reason,
+            "created_at": session.started_at,
+            "duration_s": round(time.time() - session.started_at, 4),
+            "stages": self._stage_breakdown(pstats.Stats(session.profile)),
+            "metadata": metadata or {},
+        }
+
+        # The summary goes first so a failed dump never leaves an unlisted .prof;
+        # partial files are removed either way
+        try:
+            with open(os.path.join(self.profile_dir, f"{session.id}.json"), "w") as f:
+                json.dump(info, f)
+            session.profile.dump_stats(os.path.join(self.profile_dir, f"{session.id}.prof"))
+        except Exception:
+            self._remove_profile(session.id)
+            raise
+        finally:
+            self._enforce_retention()
+        return info
+
+    def _stage_breakdown(self, stats: pstats.Stats) -> Dict[str, Dict[str, float]]:
+        breakdown = {}
+        for stage, (suffix, func_name) in STAGES.items():
+            calls, cumtime = 0, 0.0
+            for (filename, _, name), (_, nc, _, ct, _) in stats.stats.items():
+                # Keep the outermost match so wrappers are not counted twice
+                if name == func_name and filename.endswith(suffix) and ct > cumtime:
+                    calls, cumtime = nc, ct
+            breakdown[stage] = {"calls": calls, "cumtime_s": round(cumtime, 4)}
+        return breakdown
+
+    def _stored_files(self) -> Dict[str, Dict]:
+        """Size and age of every stored profile id, whether or not both files exist."""
+        stored = {}
+        if not os.path.isdir(self.profile_dir):
+            return stored
+
+        for name in os.listdir(self.profile_dir):
+            profile_id, ext = os.path.splitext(name)
+            if ext not in (".prof", ".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.profile_dir, name))
+            except OSError:
+                continue
+            entry = stored.setdefault(profile_id, {"size_bytes": 0, "mtime": 0.0, "exts": set()})
+            entry["size_bytes"] += st.st_size
+            entry["mtime"] = max(entry["mtime"], st.st_mtime)
+            entry["exts"].add(ext)
+        return stored
+
+    def list_profiles(self) -> List[Dict]:
+        """Returns complete stored profiles, newest first."""
+        profiles = []
+        for profile_id, entry in self._stored_files().items():
+            if entry["exts"] != {".prof", ".json"}:
+                continue
+            try:
+                with open(os.path.join(self.profile_dir, f"{profile_id}.json")) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            info["size_bytes"] = entry["size_bytes"]
+            profiles.append(info)
+
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        # Only bare hex ids are accepted, so the id cannot escape profile_dir
+        if not profile_id or not all(c in "0123456789abcdef" for c in profile_id):
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def _remove_profile(self, profile_id: str):
+        for ext in (".prof", ".json"):
+            path = os.path.join(self.profile_dir, f"{profile_id}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _enforce_retention(self):
+        # Incomplete profiles count against the limits too, so nothing escapes them
+        created = {p["id"]: p["created_at"] for p in self.list_profiles()}
+        stored = sorted(
+            self._stored_files().items(),
+            key=lambda item: created.get(item[0], item[1]["mtime"]),
+            reverse=True,
+        )
+        total = sum(entry["size_bytes"] for _, entry in stored)
+        while stored and (len(stored) > self.max_files or total > self.max_total_bytes):
+            profile_id, entry = stored.pop()
+            total -= entry["size_bytes"]
+            self._remove_profile(profile_id)
+
+
+request_profiler = RequestProfiler(
+    profile_dir=settings.PROFILING_DIR,
+    max_files=settings.PROFILING_MAX_FILES,
+    max_total_bytes=settings.PROFILING_MAX_TOTAL_MB * 1024 * 1024,
+    header=settings.PROFILING_HEADER,
+)
@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 import base64
 from app.services.pose_estimator import PoseEstimator
+from app.services.landmark_store import LandmarkHistory
 
 class VideoProcessor:
     def __init__(self, video_path: str):
@@ -12,6 +13,7 @@ class VideoProcessor:
         """
         Reads the video frame by frame and extracts pose landmarks.
         Returns a dictionary containing video stats and frame-by-frame landmark history.
+        The history is a LandmarkHistory; the caller must close() it when done.
         """
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
@@ -19,11 +21,12 @@ class VideoProcessor:
 
         fps = cap.get(cv2.CAP_PROP_FPS)
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         duration = frame_count / fps if fps > 0 else 0
 
-        landmarks_history = []
+        landmarks_history = LandmarkHistory(fps)
         
-        frame_idx = 0
         while cap.isOpened():
             ret, frame = cap.read()
             if not ret:
@@ -36,13 +39,7 @@ class VideoProcessor:
             landmarks = self.pose_estimator.process_frame(frame_rgb)
             
             # We record even if None (to keep time alignment)
-            landmarks_history.append({
-                "frame": frame_idx,
-                "timestamp": frame_idx / fps if fps > 0 else 0,
-                "landmarks": landmarks
-            })
-            
-            frame_idx += 1
+            landmarks_history.append(landmarks)
 
         cap.release()
         
@@ -50,6 +47,8 @@ class VideoProcessor:
             "fps": fps,
             "total_frames": frame_count,
             "duration": duration,
+            "width": width,
+            "height": height,
             "history": landmarks_history
         }
 
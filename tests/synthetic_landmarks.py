@@ -0,0 +1,36 @@
+import numpy as np
+
+def f32(value):
+    # MediaPipe landmarks are float32 values
+    return float(np.float32(value))
+
+def generate_landmarks(frames):
+    """Squat-like movement with a few frames where no pose is detected."""
+    landmarks = []
+    for i in range(frames):
+        if i % 17 == 5:
+            # Pose not detected
+            landmarks.append(None)
+            continue
+        y_hip = 0.5 + 0.2 * np.sin(i / 10.0)
+        lms = [{} for _ in range(33)]
+        lms[11] = {'x': f32(0.45 + 0.01 * np.sin(i / 7.0)), 'y': f32(0.2), 'z': 0, 'visibility': f32(0.9)}
+        lms[12] = {'x': f32(0.55), 'y': f32(0.2), 'z': 0, 'visibility': f32(0.9)}
+        lms[23] = {'x': f32(0.46), 'y': f32(y_hip), 'z': 0, 'visibility': f32(0.9)}
+        lms[24] = {'x': f32(0.54), 'y': f32(y_hip), 'z': 0, 'visibility': f32(0.9)}
+        lms[25] = {'x': f32(0.46), 'y': f32(y_hip + 0.2), 'z': 0, 'visibility': f32(0.9)}
+        lms[26] = {'x': f32(0.54), 'y': f32(y_hip + 0.21 + 0.01 * np.cos(i / 5.0)), 'z': 0, 'visibility': f32(0.9)}
+        lms[27] = {'x': f32(0.46 + 0.1 * np.sin(i / 9.0)), 'y': f32(0.9), 'z': 0, 'visibility': f32(0.9)}
+        lms[28] = {'x': f32(0.54), 'y': f32(0.9), 'z': 0, 'visibility': f32(0.9)}
+        landmarks.append(lms)
+    return landmarks
+
+def landmarks_from_points(points):
+    """Builds a 33-landmark frame from {index: (x, y)}; other landmarks stay empty."""
+    lms = [{} for _ in range(33)]
+    for idx, (x, y) in points.items():
+        lms[idx] = {'x': f32(x), 'y': f32(y), 'z': 0, 'visibility': f32(0.9)}
+    return lms
+
+def history_from(landmarks):
+    return [{"frame": i, "timestamp": i / 30.0, "landmarks": lms} for i, lms in enumerate(landmarks)]
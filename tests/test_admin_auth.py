@@ -0,0 +1,48 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.security import require_admin
+
+app = FastAPI()
+
+@app.get("/admin/ping", dependencies=[Depends(require_admin)])
+def ping():
+    return {"ok": True}
+
+client = TestClient(app)
+
+def with_token(token, fn):
+    previous = settings.PROFILING_ADMIN_TOKEN
+    settings.PROFILING_ADMIN_TOKEN = token
+    try:
+        fn()
+    finally:
+        settings.PROFILING_ADMIN_TOKEN = previous
+
+def test_no_token_configured():
+    print("Testing: admin endpoints hidden without a configured token")
+    def check():
+        assert client.get("/admin/ping").status_code == 404
+        assert client.get("/admin/ping", headers={"X-Admin-Token": "anything"}).status_code == 404
+    with_token("", check)
+
+def test_token_checks():
+    print("\nTesting: admin token validation")
+    def check():
+        assert client.get("/admin/ping").status_code == 403
+        assert client.get("/admin/ping", headers={"X-Admin-Token": "errado"}).status_code == 403
+        # Non-ASCII header values (decoded as latin-1) are rejected, not a 500
+        assert client.get("/admin/ping", headers={"X-Admin-Token": "s\xe9gredo".encode("latin-1")}).status_code == 403
+        assert client.get("/admin/ping", headers={"X-Admin-Token": "segredo"}).status_code == 200
+    with_token("segredo", check)
+
+if __name__ == "__main__":
+    test_no_token_configured()
+    test_token_checks()
+    print("\nAll admin auth tests passed!")
@@ -0,0 +1,144 @@
+import os
+import sys
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.exercise_plans import PLANS, METRICS, SERIES, compile_plan, resolve_exercise
+from app.services.metrics_engine import MetricsEngine
+from synthetic_landmarks import generate_landmarks, landmarks_from_points, history_from
+
+def test_resolve_exercise():
+    print("Testing: exercise name resolution")
+    assert resolve_exercise("Agachamento") == "agachamento"
+    assert resolve_exercise("sit-to-stand") == "sentar_levantar"
+    assert resolve_exercise("gait") == "marcha"
+    assert resolve_exercise("exercicio desconhecido") == "padrao"
+    assert resolve_exercise(None) == "padrao"
+
+def test_plans_compile_once_with_required_series_only():
+    print("\nTesting: compiled plans")
+    for name in PLANS:
+        plan = compile_plan(name)
+        assert compile_plan(name) is plan
+        assert set(METRICS) >= set(plan.metrics)
+
+    gait = compile_plan("marcha")
+    assert "l_knee_angle" not in gait.derived_series
+    squat = compile_plan("agachamento")
+    assert "l_knee_angle" in squat.derived_series
+    assert "l_hip_angle" not in squat.derived_series
+    # Shared inputs are extracted once
+    assert len(squat.columns) == len(set(squat.columns))
+
+def test_metrics_follow_plan():
+    print("\nTesting: metrics per exercise")
+    history = history_from(generate_landmarks(120))
+    engine = MetricsEngine(fps=30.0)
+
+    for exercicio, plan_name in [("agachamento", "agachamento"), ("marcha", "marcha"), ("outro", "padrao")]:
+        metricas, eventos, key_frames = engine.calculate_metrics(history, exercicio)
+        assert list(metricas) == list(PLANS[plan_name].metrics)
+        assert list(eventos) == ["perda_equilibrio"]
+        assert all(history[f]['landmarks'] is not None for f in key_frames)
+
+def test_knee_angle_on_portrait_frame():
+    print("\nTesting: joint angle on a non-square frame")
+    width, height = 1080, 1920
+    # Pixel coordinates of a 135 degree hip-knee-ankle angle
+    hip = np.array([540.0, 600.0])
+    knee = np.array([540.0, 1000.0])
+    ankle = knee + 400.0 * np.array([np.sin(np.radians(135)), -np.cos(np.radians(135))])
+
+    def normalized(point):
+        return np.array([point[0] / width]), np.array([point[1] / height])
+
+    angle = SERIES["l_knee_angle"].fn(width / height, *normalized(hip), *normalized(knee), *normalized(ankle))
+    assert abs(angle[0] - 135.0) < 1e-6
+
+    # Same geometry through the engine: 45 degrees of flexion scores 0.5
+    points = {11: (0.45, 0.1), 12: (0.55, 0.1)}
+    for idx, point in ((23, hip), (25, knee), (27, ankle), (24, hip), (26, knee), (28, ankle)):
+        points[idx] = (point[0] / width, point[1] / height)
+    history = history_from([landmarks_from_points(points)] * 5)
+    metricas, _, _ = MetricsEngine(fps=30.0, frame_width=width, frame_height=height).calculate_metrics(history, "agachamento")
+    assert metricas["amplitude_flexao_joelho"]["valor"] == 0.5
+
+SHOULDERS = {11: (0.45, 0.3), 12: (0.55, 0.3)}
+
+def legs(left, right):
+    """Hip, knee and ankle points for each leg; None leaves that leg undetected."""
+    points = dict(SHOULDERS)
+    for (hip, knee, ankle), indices in ((left, (23, 25, 27)), (right, (24, 26, 28))):
+        if hip is not None:
+            points.update(zip(indices, (hip, knee, ankle)))
+    return landmarks_from_points(points)
+
+STRAIGHT_LEG = ((0.5, 0.5), (0.5, 0.7), (0.5, 0.9))
+KNEE_90 = ((0.3, 0.7), (0.5, 0.7), (0.5, 0.9))
+KNEE_135 = ((0.5, 0.5), (0.5, 0.7), (0.5 + 0.2 * np.sin(np.radians(135)), 0.7 - 0.2 * np.cos(np.radians(135))))
+
+def knee_flexion_score(frames):
+    metricas, _, _ = MetricsEngine(fps=30.0).calculate_metrics(history_from(frames), "agachamento")
+    return metricas["amplitude_flexao_joelho"]["valor"]
+
+def test_knee_flexion_known_geometry():
+    print("\nTesting: knee flexion on known angles")
+    straight = legs(STRAIGHT_LEG, STRAIGHT_LEG)
+    assert knee_flexion_score([straight] * 5) == 0.0
+    assert knee_flexion_score([straight, straight, legs(KNEE_90, KNEE_90), straight, straight]) == 1.0
+    # The more flexed side is used (front leg of a lunge)
+    assert knee_flexion_score([straight, legs(STRAIGHT_LEG, KNEE_90), straight]) == 1.0
+    # A missing side does not hide the other one
+    assert knee_flexion_score([straight, legs(KNEE_135, (None, None, None)), straight]) == 0.5
+    # A knee landmark collapsing onto the hip is ignored, not read as full flexion
+    collapsed = ((0.5, 0.5), (0.5, 0.5), (0.5, 0.9))
+    assert knee_flexion_score([straight, legs(collapsed, collapsed), straight]) == 0.0
+
+def test_hip_extension_known_geometry():
+    print("\nTesting: hip extension on known angles")
+    seated = landmarks_from_points({**SHOULDERS, 23: (0.5, 0.5), 24: (0.5, 0.5), 25: (0.7, 0.5), 26: (0.7, 0.5)})
+    standing = landmarks_from_points({**SHOULDERS, 23: (0.5, 0.5), 24: (0.5, 0.5), 25: (0.5, 0.7), 26: (0.5, 0.7)})
+
+    def score(frames):
+        metricas, _, _ = MetricsEngine(fps=30.0).calculate_metrics(history_from(frames), "sentar_levantar")
+        return metricas["amplitude_extensao_quadril"]["valor"]
+
+    assert score([standing] * 5) == 0.0
+    assert score([seated, seated, standing, standing, standing]) == 1.0
+    # Hip landmark on top of the knee gives no angle and does not count as seated
+    collapsed = landmarks_from_points({**SHOULDERS, 23: (0.5, 0.7), 24: (0.5, 0.7), 25: (0.5, 0.7), 26: (0.5, 0.7)})
+    assert score([standing, collapsed, standing]) == 0.0
+
+def test_evidence_follows_plan():
+    print("\nTesting: evidence check per exercise")
+    frames = []
+    for i in range(60):
+        # Walking: hips stay level while the feet alternate
+        stride = 0.08 * np.sin(i / 5.0)
+        frames.append(landmarks_from_points({
+            **SHOULDERS, 23: (0.46, 0.5), 24: (0.54, 0.5), 25: (0.46, 0.7), 26: (0.54, 0.7),
+            27: (0.5 + stride, 0.9), 28: (0.5 - stride, 0.9),
+        }))
+    history = history_from(frames)
+    engine = MetricsEngine(fps=30.0)
+
+    assert not engine.validate_evidence(history, "agachamento")
+    assert engine.validate_evidence(history, "marcha")
+    assert "ankle_x_gap" in compile_plan("marcha").derived_series
+
+    # Series extracted once give the same answers as extracting per call
+    series = engine.extract_plan_series(history, "marcha")
+    assert engine.validate_evidence(history, "marcha", series)
+    assert engine.calculate_metrics(history, "marcha", series) == engine.calculate_metrics(history, "marcha")
+
+if __name__ == "__main__":
+    test_resolve_exercise()
+    test_plans_compile_once_with_required_series_only()
+    test_metrics_follow_plan()
+    test_knee_angle_on_portrait_frame()
+    test_knee_flexion_known_geometry()
+    test_hip_extension_known_geometry()
+    test_evidence_follows_plan()
+    print("\nAll exercise plan tests passed!")
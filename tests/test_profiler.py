@@ -0,0 +1,134 @@
+import cProfile
+import os
+import sys
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.profiler import RequestProfiler
+
+def make_profiler(profile_dir, max_files=20):
+    return RequestProfiler(profile_dir, max_files=max_files, max_total_bytes=10 * 1024 * 1024, header="X-Profile-Request")
+
+def test_disabled_by_default():
+    print("Testing: profiler disabled")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp)
+        assert profiler.begin({}) is None
+        assert profiler.list_profiles() == []
+
+def test_next_n_requests():
+    print("\nTesting: profile next N requests")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp)
+        profiler.arm(requests=2)
+
+        for _ in range(2):
+            session = profiler.begin({})
+            assert session is not None
+            sum(range(1000))
+            info = profiler.finish(session, {"exercicio": "agachamento"})
+            assert set(info["stages"]) == {"process_video", "pose.process", "calculate_metrics", "extract_screenshots"}
+
+        assert profiler.begin({}) is None
+        assert profiler.status()["enabled"] == False
+
+        profiles = profiler.list_profiles()
+        assert len(profiles) == 2
+        assert profiler.profile_path(profiles[0]["id"]) is not None
+        assert profiler.profile_path("../etc/passwd") is None
+
+def test_header_match():
+    print("\nTesting: profile requests matching header")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp)
+        profiler.arm(match_value="cliente-42")
+
+        assert profiler.begin({"X-Profile-Request": "outro"}) is None
+        session = profiler.begin({"X-Profile-Request": "cliente-42"})
+        assert session is not None and session.reason == "header"
+        profiler.finish(session)
+        # Header matching stays armed until disabled
+        assert profiler.status()["enabled"] == True
+
+def test_retention():
+    print("\nTesting: retention limit")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp, max_files=2)
+        profiler.arm(requests=3)
+        ids = []
+        for _ in range(3):
+            ids.append(profiler.finish(profiler.begin({}))["id"])
+
+        kept = [p["id"] for p in profiler.list_profiles()]
+        assert len(kept) == 2
+        assert ids[0] not in kept
+
+def test_busy_profiler_keeps_armed_request():
+    print("\nTesting: armed request survives a failed enable")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp)
+        profiler.arm(requests=1)
+
+        outer = cProfile.Profile()
+        outer.enable()
+        try:
+            session = profiler.begin({})
+        finally:
+            outer.disable()
+
+        if session is None:
+            # Python >= 3.12 allows one active profiler per thread
+            assert profiler.status()["remaining_requests"] == 1
+            session = profiler.begin({})
+            assert session is not None
+        session.profile.disable()
+        assert profiler.status()["remaining_requests"] == 0
+
+def test_failed_dump_leaves_no_files():
+    print("\nTesting: failed profile dump is cleaned up")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp)
+        profiler.arm(requests=1)
+        session = profiler.begin({})
+
+        def fail(path):
+            raise OSError("disk full")
+        session.profile.dump_stats = fail
+
+        try:
+            profiler.finish(session)
+            assert False, "finish should re-raise the dump error"
+        except OSError:
+            pass
+        assert os.listdir(tmp) == []
+
+def test_orphans_count_towards_retention():
+    print("\nTesting: incomplete profiles are subject to retention")
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = make_profiler(tmp, max_files=2)
+        # Left behind by a crashed worker
+        with open(os.path.join(tmp, "0123abcd.prof"), "wb") as f:
+            f.write(b"x" * 100)
+        os.utime(os.path.join(tmp, "0123abcd.prof"), (0, 0))
+
+        profiler.arm(requests=2)
+        for _ in range(2):
+            profiler.finish(profiler.begin({}))
+
+        assert "0123abcd.prof" not in os.listdir(tmp)
+        profiles = profiler.list_profiles()
+        assert len(profiles) == 2
+        # Reported size includes the JSON summary
+        assert all(p["size_bytes"] > os.path.getsize(os.path.join(tmp, f"{p['id']}.prof")) for p in profiles)
+
+if __name__ == "__main__":
+    test_disabled_by_default()
+    test_next_n_requests()
+    test_header_match()
+    test_retention()
+    test_busy_profiler_keeps_armed_request()
+    test_failed_dump_leaves_no_files()
+    test_orphans_count_towards_retention()
+    print("\nAll profiler tests passed!")